@@ -1,15 +1,65 @@
 """AIMA website scraper for checking application status."""
 
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
-from typing import Dict
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
 import httpx
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser, LexborNode
 from app.config import settings
+from app.utils import now_iso
 
 
 logger = logging.getLogger(__name__)
 
+# AIMA endpoints (settings are frozen, so bind them once at import)
+_LOGIN_URL = settings.aima_login_url
+_CHECK_URL = settings.aima_check_url
+
+# Where the final response page is dumped when DUMP_RESPONSE_HTML is enabled
+RESPONSE_DUMP_PATH = '/tmp/aima_response.html'
+
+# Precompiled patterns used on every status check
+_WS_RE = re.compile(r'\s+')
+_JS_REDIRECT_RE = re.compile(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']')
+_SALMON_RE = re.compile(r'salmon', re.IGNORECASE)
+# Hidden CSRF input: <input ... name="tok" ... value="..."> in either attribute order
+_TOKEN_RE = re.compile(
+    rb'<input[^>]*?name=["\']tok["\'][^>]*?value=["\']([^"\']+)["\']'
+    rb'|<input[^>]*?value=["\']([^"\']+)["\'][^>]*?name=["\']tok["\']',
+    re.IGNORECASE
+)
+
+# CSS selectors evaluated by the Lexbor parser
+_TOKEN_SELECTOR = 'input[name="tok"][type="hidden"]'
+# Status is in: <td style="background-color: salmon;"> (one C-level traversal,
+# case-insensitive match on the colour name)
+_STATUS_CELL_SELECTOR = 'td[style*="background-color"][style*="salmon" i]'
+
+# Sanitized status text keyed by BLAKE2b digest of the status HTML.
+# Statuses rarely change, so most checks hit this cache.
+STATUS_TEXT_CACHE_SIZE = 1024
+_status_text_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+# Logged-in AIMA sessions (cookies + status page URL) keyed by a digest of the
+# credentials. A check made while the session is fresh fetches the status page
+# directly and skips the token fetch and login POST. Kept under PHP's default
+# 24-minute session lifetime, so this helps checks that come close together
+# (/status right after setup or a scheduled check, the 10 AM / 7 PM run next
+# to a due check); the roughly hourly periodic checks always log in again.
+SESSION_REUSE_TTL = 20 * 60
+SESSION_CACHE_SIZE = 1024
+_sessions: "OrderedDict[bytes, tuple[float, httpx.Cookies, str]]" = OrderedDict()
+
+# Random per-process key for session cache digests, so the cached keys cannot
+# be used to guess passwords offline
+_SESSION_KEY_SECRET = os.urandom(32)
+
 
 class LoginFailedException(Exception):
     """Raised when login fails."""
@@ -21,6 +71,48 @@ class StatusNotFoundException(Exception):
     pass
 
 
+# Shared transport (connection pool) reused by all status checks
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+def get_http_transport() -> httpx.AsyncHTTPTransport:
+    """
+    Get the shared HTTP transport, creating it on first use.
+
+    The transport owns the connection pool, so TCP/TLS connections to AIMA
+    are kept alive and reused across checks and users. HTTP/2 is enabled, so
+    concurrent checks are multiplexed as streams over one connection when
+    the server negotiates it (falls back to HTTP/1.1 otherwise). Cookies live
+    on the per-check client, not on the transport, so sessions never mix.
+
+    Returns:
+        httpx.AsyncHTTPTransport: Shared transport
+    """
+    global _transport
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            verify=settings.verify_ssl,
+            proxy=settings.proxy_url,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                # Keep idle connections long enough to span the token GET,
+                # login POST and redirect GET, and back-to-back users
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _transport
+
+
+async def close_http_transport() -> None:
+    """Close the shared HTTP transport. Called on application shutdown."""
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
+
+
 async def get_login_token(client: httpx.AsyncClient) -> str:
     """
     Fetch the login page and extract the CSRF token.
@@ -34,51 +126,48 @@ async def get_login_token(client: httpx.AsyncClient) -> str:
     Raises:
         Exception: If token cannot be found
     """
-    response = await client.get(settings.aima_login_url)
+    response = await client.get(_LOGIN_URL)
     response.raise_for_status()
 
-    soup = BeautifulSoup(response.text, 'lxml')
-
-    # Find hidden input with name="tok"
-    token_input = soup.find('input', {'name': 'tok', 'type': 'hidden'})
-
-    if not token_input or not token_input.get('value'):
+    # Fast path: pull the token straight from the raw bytes, no decode or DOM
+    token = None
+    match = _TOKEN_RE.search(response.content)
+    if match:
+        token = (match.group(1) or match.group(2)).decode('ascii', 'replace')
+    else:
+        # Unusual markup (e.g. unquoted attributes) - fall back to the parser
+        tree = LexborHTMLParser(response.text)
+        token_input = tree.css_first(_TOKEN_SELECTOR)
+        token = token_input.attributes.get('value') if token_input else None
+
+    if not token:
         raise Exception("CSRF token not found in login page")
 
-    return token_input['value']
+    return token
 
 
-def sanitize_status_text(html_content: str) -> str:
+def extract_node_text(node: LexborNode) -> str:
     """
-    Clean and sanitize status text from HTML.
+    Extract cleaned text from an already parsed HTML node.
 
     Args:
-        html_content: Raw HTML content (typically from <ul> tag)
+        node: Parsed node (typically the <ul> tag or the status cell)
 
     Returns:
         str: Cleaned text with normalized whitespace
     """
-    import re
-
-    # Parse HTML
-    soup = BeautifulSoup(html_content, 'lxml')
-
     # Replace <br> tags with space before extracting text
-    for br in soup.find_all('br'):
+    for br in node.css('br'):
         br.replace_with(' ')
 
-    # Remove any <b> tags (keep text, just remove formatting)
-    for b_tag in soup.find_all('b'):
-        b_tag.unwrap()
-
-    # Get text content
-    text = soup.get_text()
+    # Get text content (<b> and other inline tags contribute their text as-is)
+    text = node.text()
 
     # Replace &nbsp; with regular space
     text = text.replace('\xa0', ' ')
 
     # Clean up multiple spaces and whitespace
-    text = re.sub(r'\s+', ' ', text)
+    text = _WS_RE.sub(' ', text)
 
     # Strip leading/trailing whitespace
     text = text.strip()
@@ -86,12 +175,204 @@ def sanitize_status_text(html_content: str) -> str:
     return text
 
 
+def get_status_text(node: LexborNode) -> str:
+    """
+    Get sanitized status text for a node, reusing earlier results.
+
+    Args:
+        node: Parsed status node (the <ul> tag or the status cell)
+
+    Returns:
+        str: Cleaned text with normalized whitespace
+    """
+    digest = hashlib.blake2b(node.html.encode('utf-8'), digest_size=16).digest()
+
+    status_text = _status_text_cache.get(digest)
+    if status_text is not None:
+        _status_text_cache.move_to_end(digest)
+        return status_text
+
+    status_text = extract_node_text(node)
+    _status_text_cache[digest] = status_text
+    if len(_status_text_cache) > STATUS_TEXT_CACHE_SIZE:
+        _status_text_cache.popitem(last=False)
+
+    return status_text
+
+
+def _session_key(email: str, password: str) -> bytes:
+    """
+    Get the session cache key for a set of credentials.
+
+    The password is part of the key so a wrong password never reuses the
+    session of a correct one.
+
+    Args:
+        email: User email address
+        password: User password
+
+    Returns:
+        bytes: Keyed BLAKE2b digest of the credentials
+    """
+    return hashlib.blake2b(
+        f"{email}\0{password}".encode('utf-8'),
+        key=_SESSION_KEY_SECRET,
+        digest_size=16
+    ).digest()
+
+
+def _save_session(key: bytes, cookies: httpx.Cookies, status_url: str) -> None:
+    """
+    Remember a logged-in session for later checks.
+
+    Args:
+        key: Session cache key from _session_key()
+        cookies: Session cookies after a successful check
+        status_url: URL of the page the status was read from
+    """
+    _sessions[key] = (time.monotonic(), httpx.Cookies(cookies), status_url)
+    _sessions.move_to_end(key)
+    if len(_sessions) > SESSION_CACHE_SIZE:
+        _sessions.popitem(last=False)
+
+
+def forget_session(email: str, password: str) -> None:
+    """
+    Drop any saved session for a set of credentials, e.g. when the user's
+    data is deleted.
+
+    Args:
+        email: User email address
+        password: User password
+    """
+    _sessions.pop(_session_key(email, password), None)
+
+
+async def _fetch_with_session(
+    client: httpx.AsyncClient,
+    key: bytes
+) -> Optional[httpx.Response]:
+    """
+    Fetch the status page with a saved session, if one is still fresh.
+
+    Args:
+        client: HTTP client for this check
+        key: Session cache key from _session_key()
+
+    Returns:
+        httpx.Response | None: Status page, or None if the caller must log in
+    """
+    session = _sessions.get(key)
+    if session is None:
+        return None
+
+    saved_at, cookies, status_url = session
+    if time.monotonic() - saved_at >= SESSION_REUSE_TTL:
+        _sessions.pop(key, None)
+        return None
+
+    logger.debug("Reusing saved session for %s", status_url)
+    client.cookies = cookies
+    response = await client.get(status_url)
+
+    # An expired session lands on the login page (or a page without status)
+    if 'login.php' in str(response.url) or not _SALMON_RE.search(response.text):
+        logger.debug("Saved session expired, logging in again")
+        _sessions.pop(key, None)
+        client.cookies.clear()
+        return None
+
+    return response
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> httpx.Response:
+    """
+    Log in to AIMA and return the page that holds the status.
+
+    Args:
+        client: HTTP client for this check
+        email: User email address
+        password: User password
+
+    Returns:
+        httpx.Response: Final page after login (and any JavaScript redirect)
+
+    Raises:
+        LoginFailedException: If login fails
+    """
+    # Step 1: Get CSRF token
+    logger.debug("Fetching CSRF token...")
+    token = await get_login_token(client)
+    logger.debug("Got CSRF token: %.20s...", token)
+
+    # Step 2: Login
+    login_data = {
+        'email': email,
+        'password': password,
+        'tok': token
+    }
+
+    logger.debug("Posting login request...")
+    response = await client.post(
+        _CHECK_URL,
+        data=login_data
+    )
+    logger.debug(
+        "Login response status: %s (%s)",
+        response.status_code,
+        response.http_version
+    )
+    logger.debug("Login response URL: %s", response.url)
+
+    # Check if login was successful
+    # If login fails, AIMA usually redirects back to login page
+    # or shows an error message
+    if 'login.php' in str(response.url):
+        logger.warning("Login failed - redirected to login page")
+        raise LoginFailedException("Invalid email or password")
+
+    # Step 3: Check for JavaScript redirect
+    logger.debug("Checking for JavaScript redirect...")
+
+    # Look for JavaScript redirect: window.location.href="..."
+    # A substring check on the raw bytes skips the regex (and any DOM
+    # work) on the usual pages that have no redirect at all
+    redirect_url = None
+    if b'window.location.href' in response.content:
+        # Extract URL from: window.location.href="/RAR/2fase/sumario.php"
+        match = _JS_REDIRECT_RE.search(response.text)
+        if match:
+            redirect_url = match.group(1)
+            logger.debug("Found JavaScript redirect to: %s", redirect_url)
+
+    # If there's a JavaScript redirect, follow it
+    if redirect_url:
+        # Make sure it's an absolute URL
+        if redirect_url.startswith('/'):
+            # Extract base URL from response.url
+            from urllib.parse import urljoin
+            redirect_url = urljoin(str(response.url), redirect_url)
+
+        logger.debug("Following JavaScript redirect to: %s", redirect_url)
+        response = await client.get(redirect_url)
+        logger.debug(
+            "Redirect response status: %s (%s)",
+            response.status_code,
+            response.http_version
+        )
+
+    return response
+
+
 async def login_and_get_status(email: str, password: str, user_agent: str = None) -> Dict:
     """
     Login to AIMA website and retrieve application status.
 
-    All HTTP requests will use the configured proxy if PROXY_URL is set in settings.
+    All HTTP requests go through the shared pooled transport and will use the
+    configured proxy if PROXY_URL is set in settings.
     User-Agent header will be set if user_agent parameter is provided.
+    A logged-in session from a recent check with the same credentials is
+    reused when still valid, skipping the login round-trips.
 
     Args:
         email: User email address
@@ -108,13 +389,14 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
         StatusNotFoundException: If status cannot be found
         httpx.TimeoutException: If request times out
     """
-    timestamp = datetime.utcnow().isoformat()
+    timestamp = now_iso()
+    session_key = _session_key(email, password)
 
-    logger.info(f"Starting AIMA status check for {email}")
-    logger.debug(f"SSL verification: {settings.verify_ssl}")
-    logger.debug(f"Proxy: {'Configured' if settings.proxy_url else 'Not configured'}")
-    logger.debug(f"Login URL: {settings.aima_login_url}")
-    logger.debug(f"Check URL: {settings.aima_check_url}")
+    logger.info("Starting AIMA status check for %s", email)
+    logger.debug("SSL verification: %s", settings.verify_ssl)
+    logger.debug("Proxy: %s", 'Configured' if settings.proxy_url else 'Not configured')
+    logger.debug("Login URL: %s", _LOGIN_URL)
+    logger.debug("Check URL: %s", _CHECK_URL)
 
     timeout = httpx.Timeout(
         connect=10.0,
@@ -127,142 +409,81 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
     headers = {}
     if user_agent:
         headers["User-Agent"] = user_agent
-        logger.debug(f"Using user agent: {user_agent[:50]}...")
+        logger.debug("Using user agent: %.50s...", user_agent)
 
     try:
-        # Create client with cookies enabled
-        async with httpx.AsyncClient(
+        # Per-check client keeps its own cookie jar (session isolation)
+        # while sharing the pooled transport with all other checks.
+        # It is intentionally not closed: that would close the shared transport.
+        client = httpx.AsyncClient(
+            transport=get_http_transport(),
             follow_redirects=True,
             timeout=timeout,
-            verify=settings.verify_ssl,
-            proxy=settings.proxy_url,
             headers=headers
-        ) as client:
-
-            logger.debug("Created HTTP client")
-
-            # Step 1: Get CSRF token
-            logger.debug("Fetching CSRF token...")
-            token = await get_login_token(client)
-            logger.debug(f"Got CSRF token: {token[:20]}...")
-
-            # Step 2: Login
-            login_data = {
-                'email': email,
-                'password': password,
-                'tok': token
-            }
-
-            logger.debug("Posting login request...")
-            response = await client.post(
-                settings.aima_check_url,
-                data=login_data
-            )
-            logger.debug(f"Login response status: {response.status_code}")
-            logger.debug(f"Login response URL: {response.url}")
-
-            # Check if login was successful
-            # If login fails, AIMA usually redirects back to login page
-            # or shows an error message
-            if 'login.php' in str(response.url):
-                logger.warning("Login failed - redirected to login page")
-                raise LoginFailedException("Invalid email or password")
-
-            # Step 3: Check for JavaScript redirect
-            logger.debug("Checking for JavaScript redirect...")
-            soup_initial = BeautifulSoup(response.text, 'lxml')
-
-            # Look for JavaScript redirect: window.location.href="..."
-            scripts = soup_initial.find_all('script')
-            redirect_url = None
-
-            for script in scripts:
-                if script.string and 'window.location.href' in script.string:
-                    # Extract URL from: window.location.href="/RAR/2fase/sumario.php"
-                    import re
-                    match = re.search(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', script.string)
-                    if match:
-                        redirect_url = match.group(1)
-                        logger.debug(f"Found JavaScript redirect to: {redirect_url}")
-                        break
-
-            # If there's a JavaScript redirect, follow it
-            if redirect_url:
-                # Make sure it's an absolute URL
-                if redirect_url.startswith('/'):
-                    # Extract base URL from response.url
-                    from urllib.parse import urljoin
-                    redirect_url = urljoin(str(response.url), redirect_url)
-
-                logger.debug(f"Following JavaScript redirect to: {redirect_url}")
-                response = await client.get(redirect_url)
-                logger.debug(f"Redirect response status: {response.status_code}")
-
-            # Save response to file for debugging
+        )
+
+        logger.debug("Created HTTP client")
+
+        # Reuse a fresh logged-in session if there is one, else log in
+        response = await _fetch_with_session(client, session_key)
+        if response is None:
+            response = await _login(client, email, password)
+
+        # Save response to file for debugging (off the event loop)
+        if settings.dump_response_html and logger.isEnabledFor(logging.DEBUG):
             try:
-                with open('/tmp/aima_response.html', 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                logger.debug("Saved final response HTML to /tmp/aima_response.html")
+                await asyncio.to_thread(
+                    Path(RESPONSE_DUMP_PATH).write_text,
+                    response.text,
+                    encoding='utf-8'
+                )
+                logger.debug("Saved final response HTML to %s", RESPONSE_DUMP_PATH)
             except Exception as e:
-                logger.warning(f"Could not save response HTML: {e}")
+                logger.warning("Could not save response HTML: %s", e)
 
-            # Step 4: Parse response HTML
+        # Step 4: Parse response HTML (the only DOM built per check)
+        # Pages without a salmon-coloured element (error/maintenance pages)
+        # cannot contain the status cell, so skip building a DOM for them
+        status_cell = None
+        if _SALMON_RE.search(response.text):
             logger.debug("Parsing response HTML...")
-            soup = BeautifulSoup(response.text, 'lxml')
-
-            # Find table with background-color: salmon
-            # The status is in: <table style="width: 100%"><tbody><tr><td style="background-color: salmon;">
-            status_cell = None
-
-            # Search for td with background-color: salmon
-            for td in soup.find_all('td'):
-                style = td.get('style', '')
-                if 'background-color' in style and 'salmon' in style.lower():
-                    status_cell = td
-                    break
-
-            if not status_cell:
-                # Try alternative: look for table with salmon background
-                for table in soup.find_all('table'):
-                    for td in table.find_all('td'):
-                        style = td.get('style', '')
-                        if 'background-color' in style and 'salmon' in style.lower():
-                            status_cell = td
-                            break
-                    if status_cell:
-                        break
-
-            if not status_cell:
-                logger.error("Status table not found in response")
-                raise StatusNotFoundException(
-                    "Could not find status table with salmon background"
-                )
+            tree = LexborHTMLParser(response.text)
+            status_cell = tree.css_first(_STATUS_CELL_SELECTOR)
+
+        if not status_cell:
+            logger.error("Status table not found in response")
+            raise StatusNotFoundException(
+                "Could not find status table with salmon background"
+            )
+
+        # Extract and clean text
+        logger.debug("Extracting and sanitizing status text...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw status HTML (first 500 chars): %.500s", status_cell.html)
 
-            # Extract and clean text
-            logger.debug("Extracting and sanitizing status text...")
-            status_html = str(status_cell)
-            logger.debug(f"Raw status HTML (first 500 chars): {status_html[:500]}")
-
-            # The actual status text is in a <ul> tag inside the td
-            ul_tag = status_cell.find('ul')
-            if ul_tag:
-                logger.debug("Found <ul> tag with status text")
-                status_text = sanitize_status_text(str(ul_tag))
-            else:
-                logger.debug("No <ul> tag found, using entire cell content")
-                status_text = sanitize_status_text(status_html)
-
-            logger.debug(f"Sanitized status text: {status_text}")
-
-            logger.info("Status check successful")
-            return {
-                "status": "success",
-                "status_text": status_text,
-                "timestamp": timestamp
-            }
+        # The actual status text is in a <ul> tag inside the td
+        ul_tag = status_cell.css_first('ul')
+        if ul_tag:
+            logger.debug("Found <ul> tag with status text")
+            status_text = get_status_text(ul_tag)
+        else:
+            logger.debug("No <ul> tag found, using entire cell content")
+            status_text = get_status_text(status_cell)
+
+        logger.debug("Sanitized status text: %s", status_text)
+
+        _save_session(session_key, client.cookies, str(response.url))
+
+        logger.info("Status check successful")
+        return {
+            "status": "success",
+            "status_text": status_text,
+            "timestamp": timestamp
+        }
 
     except LoginFailedException as e:
-        logger.error(f"Login failed: {e}")
+        logger.error("Login failed: %s", e)
+        _sessions.pop(session_key, None)
         return {
             "status": "error",
             "error": str(e),
@@ -270,7 +491,8 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
         }
 
     except StatusNotFoundException as e:
-        logger.error(f"Status not found: {e}")
+        logger.error("Status not found: %s", e)
+        _sessions.pop(session_key, None)
         return {
             "status": "error",
             "error": str(e),
@@ -278,7 +500,7 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
         }
 
     except httpx.TimeoutException as e:
-        logger.error(f"Request timeout: {e}")
+        logger.error("Request timeout: %s", e)
         return {
             "status": "error",
             "error": "Request timed out - AIMA website may be slow or unavailable",
@@ -286,7 +508,7 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
         }
 
     except httpx.HTTPError as e:
-        logger.error(f"HTTP error: {e}", exc_info=True)
+        logger.error("HTTP error: %s", e, exc_info=True)
         return {
             "status": "error",
             "error": f"HTTP error: {str(e)}",
@@ -294,7 +516,7 @@ async def login_and_get_status(email: str, password: str, user_agent: str = None
         }
 
     except Exception as e:
-        logger.error(f"Unexpected error: {e}", exc_info=True)
+        logger.error("Unexpected error: %s", e, exc_info=True)
         return {
             "status": "error",
             "error": f"Unexpected error: {str(e)}",
@@ -13,6 +13,10 @@ class Settings(BaseSettings):
     # Database
     database_path: str = "./data/aima.db"
 
+    # Number of pooled SQLite connections, opened once and reused by every
+    # query
+    db_pool_size: int = 5
+
     # Logging
     log_level: str = "INFO"
 
@@ -23,6 +27,12 @@ class Settings(BaseSettings):
     # SSL verification (set to False if AIMA has certificate issues)
     verify_ssl: bool = False
 
+    # Dump the final AIMA response page to /tmp for debugging (needs DEBUG logging)
+    dump_response_html: bool = False
+
+    # Maximum number of AIMA checks in flight at once across scheduled checks
+    hourly_concurrency: int = 8
+
     # HTTP/HTTPS Proxy (optional)
     proxy_url: Optional[str] = None
 
@@ -30,6 +40,8 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        # Settings are read-only after startup
+        frozen=True,
     )
 
 
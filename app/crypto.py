@@ -1,9 +1,32 @@
-"""Encryption utilities using Fernet symmetric encryption."""
+"""Encryption utilities using AES-GCM authenticated encryption."""
 
 import hmac
 import hashlib
 import base64
+import os
+from collections import OrderedDict
+from typing import Callable, TypeVar
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from app.config import settings
+
+
+# Prefix marking AES-GCM ciphertexts. Fernet tokens are URL-safe base64
+# and can never contain ':', so values without it are legacy Fernet tokens.
+AESGCM_PREFIX = "v2:"
+
+# AES-GCM nonce size in bytes (96 bits, as recommended for GCM)
+NONCE_SIZE = 12
+
+# Per-user ciphers, kept so the key is derived once per user rather than on
+# every encrypt/decrypt. Entries are dropped by forget_user_keys() when a
+# user's data is deleted.
+KEY_CACHE_SIZE = 10000
+_cipher_cache: "OrderedDict[int, AESGCM]" = OrderedDict()
+_fernet_cache: "OrderedDict[int, Fernet]" = OrderedDict()
+
+_T = TypeVar("_T")
 
 
 class EncryptionError(Exception):
@@ -11,61 +34,150 @@ class EncryptionError(Exception):
     pass
 
 
-def get_encryption_key(bot_token: str, user_id: int) -> bytes:
+def derive_key_material(bot_token: str, user_id: int) -> bytes:
     """
-    Derive an encryption key from bot token and user ID.
+    Derive raw 32-byte key material from bot token and user ID.
 
-    Uses HMAC-SHA256 to derive a key, then formats it for Fernet.
+    Uses HMAC-SHA256 with the bot token as key and the user ID as message.
 
     Args:
         bot_token: Telegram bot token (secret)
         user_id: Telegram user ID
 
     Returns:
-        bytes: Fernet-compatible encryption key
+        bytes: 32 bytes of key material
     """
-    # Create HMAC using bot token as key and user_id as message
     message = str(user_id).encode('utf-8')
-    key_material = hmac.new(
+    return hmac.new(
         bot_token.encode('utf-8'),
         message,
         hashlib.sha256
     ).digest()
 
+
+def get_encryption_key(bot_token: str, user_id: int) -> bytes:
+    """
+    Derive a Fernet-formatted encryption key from bot token and user ID.
+
+    Only needed to read values stored before the switch to AES-GCM.
+
+    Args:
+        bot_token: Telegram bot token (secret)
+        user_id: Telegram user ID
+
+    Returns:
+        bytes: Fernet-compatible encryption key
+    """
     # Fernet requires 32 bytes, URL-safe base64 encoded
-    # We already have 32 bytes from SHA256, encode to base64
-    return base64.urlsafe_b64encode(key_material)
+    return base64.urlsafe_b64encode(derive_key_material(bot_token, user_id))
+
+
+def _get_cached(
+    cache: "OrderedDict[int, _T]",
+    user_id: int,
+    factory: Callable[[int], _T]
+) -> _T:
+    """
+    Get a user's cipher from an LRU cache, creating it on a miss.
+
+    Args:
+        cache: Cache to look up
+        user_id: Telegram user ID
+        factory: Builds the cipher for a user ID
+
+    Returns:
+        Cipher keyed with the user's derived key
+    """
+    cipher = cache.get(user_id)
+    if cipher is not None:
+        cache.move_to_end(user_id)
+        return cipher
+
+    cipher = factory(user_id)
+    cache[user_id] = cipher
+    if len(cache) > KEY_CACHE_SIZE:
+        cache.popitem(last=False)
+
+    return cipher
+
+
+def _get_cipher(user_id: int) -> AESGCM:
+    """
+    Get a cached AES-GCM cipher for a user.
+
+    Args:
+        user_id: Telegram user ID
+
+    Returns:
+        AESGCM: Cipher keyed with the user's derived key
+    """
+    return _get_cached(
+        _cipher_cache,
+        user_id,
+        lambda uid: AESGCM(derive_key_material(settings.telegram_bot_token, uid))
+    )
 
 
-def encrypt_value(value: str, key: bytes) -> str:
+def _get_fernet(user_id: int) -> Fernet:
     """
-    Encrypt a string value using Fernet.
+    Get a cached Fernet instance for decrypting legacy values.
 
     Args:
+        user_id: Telegram user ID
+
+    Returns:
+        Fernet: Cipher keyed with the user's derived key
+    """
+    return _get_cached(
+        _fernet_cache,
+        user_id,
+        lambda uid: Fernet(get_encryption_key(settings.telegram_bot_token, uid))
+    )
+
+
+def forget_user_keys(user_id: int) -> None:
+    """
+    Drop a user's cached ciphers, e.g. after their data is deleted.
+
+    Args:
+        user_id: Telegram user ID
+    """
+    _cipher_cache.pop(user_id, None)
+    _fernet_cache.pop(user_id, None)
+
+
+def _encrypt(cipher: AESGCM, value: str) -> str:
+    """
+    Encrypt a string value with an already-resolved AES-GCM cipher.
+
+    Args:
+        cipher: The user's AES-GCM cipher
         value: String to encrypt
-        key: Encryption key from get_encryption_key()
 
     Returns:
-        str: Encrypted value (base64 encoded)
+        str: Encrypted value ("v2:" + base64 of nonce || ciphertext || tag)
 
     Raises:
         EncryptionError: If encryption fails
     """
     try:
-        fernet = Fernet(key)
-        encrypted = fernet.encrypt(value.encode('utf-8'))
-        return encrypted.decode('utf-8')
+        nonce = os.urandom(NONCE_SIZE)
+        encrypted = cipher.encrypt(nonce, value.encode('utf-8'), None)
+        return AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + encrypted).decode('ascii')
     except Exception as e:
         raise EncryptionError(f"Failed to encrypt value: {e}")
 
 
-def decrypt_value(encrypted: str, key: bytes) -> str:
+def _decrypt(cipher: AESGCM, encrypted: str, user_id: int) -> str:
     """
-    Decrypt a Fernet-encrypted value.
+    Decrypt a value with an already-resolved AES-GCM cipher.
+
+    Legacy Fernet values fall back to the user's cached Fernet instance.
 
     Args:
-        encrypted: Encrypted string (from encrypt_value)
-        key: Encryption key from get_encryption_key()
+        cipher: The user's AES-GCM cipher
+        encrypted: Encrypted string (from encrypt_credentials)
+        user_id: Telegram user ID the value belongs to
 
     Returns:
         str: Decrypted value
@@ -74,10 +186,58 @@ def decrypt_value(encrypted: str, key: bytes) -> str:
         EncryptionError: If decryption fails or data is corrupted
     """
     try:
-        fernet = Fernet(key)
-        decrypted = fernet.decrypt(encrypted.encode('utf-8'))
+        if encrypted.startswith(AESGCM_PREFIX):
+            raw = base64.urlsafe_b64decode(encrypted[len(AESGCM_PREFIX):])
+            decrypted = cipher.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None)
+        else:
+            decrypted = _get_fernet(user_id).decrypt(encrypted.encode('utf-8'))
         return decrypted.decode('utf-8')
-    except InvalidToken:
+    except (InvalidTag, InvalidToken):
         raise EncryptionError("Invalid encryption key or corrupted data")
     except Exception as e:
         raise EncryptionError(f"Failed to decrypt value: {e}")
+
+
+def encrypt_credentials(email: str, password: str, user_id: int) -> tuple[str, str]:
+    """
+    Encrypt a user's email and password with a single cipher lookup.
+
+    Args:
+        email: AIMA email
+        password: AIMA password
+        user_id: Telegram user ID the credentials belong to
+
+    Returns:
+        tuple[str, str]: Encrypted email and encrypted password
+
+    Raises:
+        EncryptionError: If encryption fails
+    """
+    cipher = _get_cipher(user_id)
+    return _encrypt(cipher, email), _encrypt(cipher, password)
+
+
+def decrypt_credentials(
+    email_encrypted: str,
+    password_encrypted: str,
+    user_id: int
+) -> tuple[str, str]:
+    """
+    Decrypt a user's stored email and password with a single cipher lookup.
+
+    Args:
+        email_encrypted: Encrypted email
+        password_encrypted: Encrypted password
+        user_id: Telegram user ID the credentials belong to
+
+    Returns:
+        tuple[str, str]: Email and password
+
+    Raises:
+        EncryptionError: If decryption fails or data is corrupted
+    """
+    cipher = _get_cipher(user_id)
+    return (
+        _decrypt(cipher, email_encrypted, user_id),
+        _decrypt(cipher, password_encrypted, user_id)
+    )
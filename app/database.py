@@ -1,22 +1,107 @@
 """Database connection and initialization with aiosqlite."""
 
-import aiosqlite
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, Optional
+import aiosqlite
+from aiosqlitepool import SQLiteConnectionPool
 from app.config import settings
 
 
-async def get_db_connection() -> aiosqlite.Connection:
+# Connection-level tuning, applied once when the pool opens a connection.
+# With WAL (set once in init_db), synchronous=NORMAL avoids an fsync per
+# commit; mmap and a larger page cache cut page reads; the checkpoint
+# threshold keeps the -wal file from growing between checkpoints.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+
+
+async def apply_pragmas(conn: aiosqlite.Connection) -> None:
+    """
+    Apply per-connection performance PRAGMAs to a new connection.
+
+    Args:
+        conn: Open database connection
     """
-    Get a database connection with row factory enabled.
+    for pragma in CONNECTION_PRAGMAS:
+        await conn.execute(pragma)
+
+
+# Shared connection pool, created on first use
+_pool: Optional[SQLiteConnectionPool] = None
+
+# Serializes writers in-process: SQLite allows a single writer anyway, and
+# waiting here is cheaper than spinning in busy_timeout on a pool thread
+_write_lock = asyncio.Lock()
+
+
+async def _create_connection() -> aiosqlite.Connection:
+    """
+    Open a new pooled connection with row factory and PRAGMAs applied.
 
     Returns:
-        aiosqlite.Connection: Database connection
+        aiosqlite.Connection: Tuned database connection
     """
     conn = await aiosqlite.connect(settings.database_path)
     conn.row_factory = aiosqlite.Row
+    await apply_pragmas(conn)
     return conn
 
 
+def _get_pool() -> SQLiteConnectionPool:
+    """
+    Get the shared connection pool, creating it on first use.
+
+    Returns:
+        SQLiteConnectionPool: Shared pool
+    """
+    global _pool
+    if _pool is None:
+        _pool = SQLiteConnectionPool(
+            _create_connection,
+            pool_size=settings.db_pool_size
+        )
+    return _pool
+
+
+@asynccontextmanager
+async def get_db_connection() -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Borrow a pooled database connection for reads.
+
+    Yields:
+        aiosqlite.Connection: Connection with row factory enabled
+    """
+    async with _get_pool().connection() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def write_transaction() -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Run a write transaction on a pooled connection.
+
+    Commits on normal exit and rolls back if the block raises.
+
+    Yields:
+        aiosqlite.Connection: Connection with row factory enabled
+    """
+    async with _write_lock, _get_pool().connection() as conn:
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+
+
 async def init_db() -> None:
     """Initialize database schema - create tables if they don't exist."""
 
@@ -24,7 +109,13 @@ async def init_db() -> None:
     db_path = Path(settings.database_path)
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
-    async with aiosqlite.connect(settings.database_path) as conn:
+    # journal_mode is persisted in the database file, so set it only once
+    # here instead of on every pooled connection. WAL lets readers run
+    # alongside the writer.
+    async with get_db_connection() as conn:
+        await conn.execute("PRAGMA journal_mode=WAL")
+
+    async with write_transaction() as conn:
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,6 +125,7 @@ async def init_db() -> None:
                 last_status TEXT,
                 last_checked_at TEXT,
                 periodic_check_enabled INTEGER DEFAULT 0,
+                next_check_at TEXT,
                 created_at TEXT NOT NULL,
                 updated_at TEXT NOT NULL
             )
@@ -44,11 +136,39 @@ async def init_db() -> None:
             ON users(telegram_user_id)
         """)
 
-        await conn.commit()
+        # Databases created before next_check_at existed get the column now.
+        # Their enabled users are spread over the coming hour instead of all
+        # becoming due on the first tick.
+        columns = await conn.execute_fetchall("PRAGMA table_info(users)")
+        if not any(column['name'] == 'next_check_at' for column in columns):
+            await conn.execute("ALTER TABLE users ADD COLUMN next_check_at TEXT")
+            await conn.execute("""
+                UPDATE users
+                SET next_check_at = strftime(
+                    '%Y-%m-%dT%H:%M:%S+00:00',
+                    'now',
+                    '+' || (abs(random()) % 3600) || ' seconds'
+                )
+                WHERE periodic_check_enabled = 1
+            """)
+
+        # Lets the scheduler's periodic-user query range-scan in id order
+        # instead of scanning and sorting the whole table.
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_periodic
+            ON users(periodic_check_enabled, id)
+        """)
+
+        # Lets each due-check tick find only the users whose time has come
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_users_due
+            ON users(periodic_check_enabled, next_check_at)
+        """)
 
 
 async def close_db() -> None:
-    """Cleanup database connections. Called on application shutdown."""
-    # With aiosqlite, connections are managed per-operation
-    # This is a placeholder for future cleanup if needed
-    pass
+    """Close all pooled database connections. Called on application shutdown."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
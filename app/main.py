@@ -6,7 +6,9 @@ import asyncio
 from contextlib import asynccontextmanager
 from urllib.parse import urlparse
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app import aima_checker
 from app.config import settings
 from app.database import init_db, close_db
 from app.routers import web
@@ -92,12 +94,15 @@ async def lifespan(app: FastAPI):
 
     # Stop scheduler
     if scheduler:
-        scheduler.stop()
+        await scheduler.stop()
 
     # Stop bot
     if bot_app:
         await stop_bot(bot_app)
 
+    # Close shared HTTP connection pool
+    await aima_checker.close_http_transport()
+
     # Close database
     await close_db()
 
@@ -109,6 +114,7 @@ app = FastAPI(
     title="AIMA Status Checker",
     description="Check AIMA application status via web interface or Telegram bot",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
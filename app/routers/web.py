@@ -1,20 +1,26 @@
 """Web interface routes for FastAPI."""
 
-from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from pathlib import Path
+from fastapi import APIRouter, Form
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from app import aima_checker
 from app.constants import get_random_user_agent
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+# Resolved from this file so the app can be imported from any directory
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+
+# The login page is static (no request-dependent values), so render it once
+_INDEX_HTML = templates.get_template("index.html").render()
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request):
-    """Render the main page with login form."""
-    return templates.TemplateResponse("index.html", {"request": request})
+async def index():
+    """Serve the pre-rendered main page with login form."""
+    return HTMLResponse(_INDEX_HTML)
 
 
 @router.post("/check")
@@ -30,18 +36,18 @@ async def check_status(
         password: User password
 
     Returns:
-        JSONResponse: Status check result
+        ORJSONResponse: Status check result
     """
     # For web interface without user context, use a random user agent
     user_agent = get_random_user_agent()
     result = await aima_checker.login_and_get_status(email, password, user_agent)
-    return JSONResponse(content=result)
+    return ORJSONResponse(content=result)
 
 
-@router.get("/health")
+@router.get("/health", status_code=204)
 async def health_check():
-    """Health check endpoint for Docker."""
-    return {"status": "ok"}
+    """Health check endpoint for Docker (empty 204, no body to serialize)."""
+    return Response(status_code=204)
 
 
 @router.get("/config")
@@ -1,172 +1,356 @@
 """User service layer for database operations using raw SQL."""
 
+import random
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Optional
 import aiosqlite
-from app.config import settings
-
-
-async def create_user(
+from app.database import get_db_connection, write_transaction
+from app.utils import iso_after, now_iso
+
+
+# Rows fetched per page by iter_users_with_periodic_check()
+PERIODIC_USERS_PAGE_SIZE = 500
+
+# Each user with periodic checks is checked about once an hour; the random
+# jitter (±2 minutes) keeps checks from settling into a predictable pattern
+CHECK_INTERVAL_SECONDS = 60 * 60
+CHECK_JITTER_SECONDS = 2 * 60
+
+# Statements are module constants so every call passes the identical string
+# and hits the pooled connection's prepared-statement cache.
+_SQL_UPSERT_USER_WITH_STATUS = """
+    INSERT INTO users (
+        telegram_user_id,
+        email_encrypted,
+        password_encrypted,
+        last_status,
+        last_checked_at,
+        created_at,
+        updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(telegram_user_id) DO UPDATE SET
+        email_encrypted = excluded.email_encrypted,
+        password_encrypted = excluded.password_encrypted,
+        last_status = excluded.last_status,
+        last_checked_at = excluded.last_checked_at,
+        updated_at = excluded.updated_at
+"""
+
+_SQL_GET_CREDENTIALS = """
+    SELECT email_encrypted, password_encrypted
+    FROM users
+    WHERE telegram_user_id = ?
+"""
+
+# Only writes when the status text differs, so unchanged checks cost no WAL
+# write. last_checked_at therefore records the check that saw the change.
+_SQL_UPDATE_LAST_STATUS = """
+    UPDATE users
+    SET last_status = ?,
+        last_checked_at = ?,
+        updated_at = ?
+    WHERE telegram_user_id = ? AND last_status IS NOT ?
+"""
+
+_SQL_SET_PERIODIC_CHECK = """
+    UPDATE users
+    SET periodic_check_enabled = ?,
+        next_check_at = ?,
+        updated_at = ?
+    WHERE telegram_user_id = ? AND periodic_check_enabled IS NOT ?
+"""
+
+_SQL_DISABLE_PERIODIC_RETURNING = """
+    UPDATE users
+    SET periodic_check_enabled = 0,
+        next_check_at = NULL,
+        updated_at = ?
+    WHERE telegram_user_id = ?
+    RETURNING 1
+"""
+
+# No LIMIT: the checks themselves are throttled by the scheduler's fixed
+# worker pool, and a per-tick cap would bound throughput at cap * 12 users an
+# hour, so a large enough user base could never catch up.
+_SQL_GET_DUE_USERS = """
+    SELECT
+        telegram_user_id,
+        email_encrypted,
+        password_encrypted,
+        last_status,
+        next_check_at
+    FROM users
+    WHERE periodic_check_enabled = 1 AND next_check_at <= ?
+"""
+
+_SQL_SET_NEXT_CHECK = """
+    UPDATE users
+    SET next_check_at = ?
+    WHERE telegram_user_id = ?
+"""
+
+_SQL_GET_PERIODIC_USERS_PAGE = """
+    SELECT id, telegram_user_id, email_encrypted, password_encrypted, last_status
+    FROM users
+    WHERE periodic_check_enabled = 1 AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+
+_SQL_DELETE_USER_RETURNING = """
+    DELETE FROM users
+    WHERE telegram_user_id = ?
+    RETURNING email_encrypted, password_encrypted
+"""
+
+
+async def upsert_user_with_status(
     telegram_user_id: int,
     email_encrypted: str,
-    password_encrypted: str
-) -> int:
+    password_encrypted: str,
+    status: str,
+    checked_at: str
+) -> None:
     """
-    Create a new user with encrypted credentials.
+    Create a user or replace their credentials, storing the first status.
+
+    A single INSERT ... ON CONFLICT statement, so saving credentials costs
+    one transaction and has no read-before-write race.
 
     Args:
         telegram_user_id: Telegram user ID
         email_encrypted: Encrypted email
         password_encrypted: Encrypted password
-
-    Returns:
-        int: ID of created user
-
-    Raises:
-        aiosqlite.IntegrityError: If user already exists
+        status: Status text
+        checked_at: ISO format timestamp
     """
-    now = datetime.utcnow().isoformat()
+    now = now_iso()
 
-    async with aiosqlite.connect(settings.database_path) as conn:
-        cursor = await conn.execute("""
-            INSERT INTO users (
-                telegram_user_id,
-                email_encrypted,
-                password_encrypted,
-                created_at,
-                updated_at
-            ) VALUES (?, ?, ?, ?, ?)
-        """, (telegram_user_id, email_encrypted, password_encrypted, now, now))
+    async with write_transaction() as conn:
+        await conn.execute(_SQL_UPSERT_USER_WITH_STATUS, (
+            telegram_user_id,
+            email_encrypted,
+            password_encrypted,
+            status,
+            checked_at,
+            now,
+            now
+        ))
 
-        await conn.commit()
-        return cursor.lastrowid
 
-
-async def get_user_by_telegram_id(telegram_user_id: int) -> Optional[dict]:
+async def get_credentials(telegram_user_id: int) -> Optional[tuple[str, str]]:
     """
-    Get user by Telegram user ID.
+    Get only a user's encrypted credentials.
 
     Args:
         telegram_user_id: Telegram user ID
 
     Returns:
-        dict | None: User data as dictionary, or None if not found
+        tuple[str, str] | None: Encrypted email and encrypted password, or
+            None if not found
     """
-    async with aiosqlite.connect(settings.database_path) as conn:
-        conn.row_factory = aiosqlite.Row
-        cursor = await conn.execute("""
-            SELECT * FROM users WHERE telegram_user_id = ?
-        """, (telegram_user_id,))
+    async with get_db_connection() as conn:
+        rows = await conn.execute_fetchall(
+            _SQL_GET_CREDENTIALS,
+            (telegram_user_id,)
+        )
 
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        return (rows[0][0], rows[0][1]) if rows else None
 
 
-async def update_user_credentials(
+async def update_last_status(
     telegram_user_id: int,
-    email_encrypted: str,
-    password_encrypted: str
-) -> None:
+    status: str,
+    checked_at: str
+) -> bool:
     """
-    Update user credentials.
+    Update user's last status and check time if the status changed.
 
     Args:
         telegram_user_id: Telegram user ID
-        email_encrypted: New encrypted email
-        password_encrypted: New encrypted password
-    """
-    now = datetime.utcnow().isoformat()
+        status: Status text
+        checked_at: ISO format timestamp
 
-    async with aiosqlite.connect(settings.database_path) as conn:
-        await conn.execute("""
-            UPDATE users
-            SET email_encrypted = ?,
-                password_encrypted = ?,
-                updated_at = ?
-            WHERE telegram_user_id = ?
-        """, (email_encrypted, password_encrypted, now, telegram_user_id))
+    Returns:
+        bool: True if the stored status differed and was updated
+    """
+    now = now_iso()
 
-        await conn.commit()
+    async with write_transaction() as conn:
+        cursor = await conn.execute(
+            _SQL_UPDATE_LAST_STATUS,
+            (status, checked_at, now, telegram_user_id, status)
+        )
+        return cursor.rowcount > 0
 
 
-async def update_last_status(
-    telegram_user_id: int,
-    status: str,
-    checked_at: str
-) -> None:
+async def set_periodic_check(telegram_user_id: int, enabled: bool) -> bool:
     """
-    Update user's last status and check time.
+    Enable or disable periodic checks for a user.
+
+    Nothing is written when the flag already has the requested value.
+    Enabling schedules the first periodic check about an hour from now,
+    since the user has just been checked.
 
     Args:
         telegram_user_id: Telegram user ID
-        status: Status text
-        checked_at: ISO format timestamp
-    """
-    now = datetime.utcnow().isoformat()
+        enabled: True to enable, False to disable
 
-    async with aiosqlite.connect(settings.database_path) as conn:
-        await conn.execute("""
-            UPDATE users
-            SET last_status = ?,
-                last_checked_at = ?,
-                updated_at = ?
-            WHERE telegram_user_id = ?
-        """, (status, checked_at, now, telegram_user_id))
+    Returns:
+        bool: True if the flag changed
+    """
+    now = now_iso()
+    enabled_int = int(enabled)
+    next_check_at = _next_check_at() if enabled else None
 
-        await conn.commit()
+    async with write_transaction() as conn:
+        cursor = await conn.execute(
+            _SQL_SET_PERIODIC_CHECK,
+            (enabled_int, next_check_at, now, telegram_user_id, enabled_int)
+        )
+        return cursor.rowcount > 0
 
 
-async def set_periodic_check(telegram_user_id: int, enabled: bool) -> None:
+async def try_disable_periodic(telegram_user_id: int) -> bool:
     """
-    Enable or disable periodic checks for a user.
+    Disable periodic checks for a user, reporting whether the user exists.
+
+    Uses UPDATE ... RETURNING, so callers need no SELECT beforehand.
 
     Args:
         telegram_user_id: Telegram user ID
-        enabled: True to enable, False to disable
+
+    Returns:
+        bool: True if the user exists (their checks are now disabled)
+    """
+    async with write_transaction() as conn:
+        rows = await conn.execute_fetchall(
+            _SQL_DISABLE_PERIODIC_RETURNING,
+            (now_iso(), telegram_user_id)
+        )
+        return bool(rows)
+
+
+def _next_check_at(
+    previous: Optional[str] = None,
+    now: Optional[str] = None
+) -> str:
     """
-    now = datetime.utcnow().isoformat()
-    enabled_int = 1 if enabled else 0
+    Get a user's next periodic check time: one interval on, jittered.
 
-    async with aiosqlite.connect(settings.database_path) as conn:
-        await conn.execute("""
-            UPDATE users
-            SET periodic_check_enabled = ?,
-                updated_at = ?
-            WHERE telegram_user_id = ?
-        """, (enabled_int, now, telegram_user_id))
+    Counting from the previous due time keeps the user's place in the hour
+    instead of drifting later by however long each tick took to pick them
+    up. Whole intervals that already passed (e.g. during downtime) are
+    skipped, so after an outage users stay spread over the hour rather than
+    all landing in the same few minutes.
 
-        await conn.commit()
+    Args:
+        previous: The due time just claimed, if any
+        now: Current ISO timestamp, if the caller already has one
 
+    Returns:
+        str: ISO timestamp of the next check
+    """
+    offset = (
+        CHECK_INTERVAL_SECONDS
+        + random.uniform(-CHECK_JITTER_SECONDS, CHECK_JITTER_SECONDS)
+    )
+
+    if previous is None:
+        return iso_after(offset)
+
+    elapsed = (
+        datetime.fromisoformat(now or now_iso())
+        - datetime.fromisoformat(previous)
+    ).total_seconds()
+    if elapsed >= offset:
+        missed = int((elapsed - offset) // CHECK_INTERVAL_SECONDS) + 1
+        offset += missed * CHECK_INTERVAL_SECONDS
+
+    return iso_after(offset, start=previous)
 
-async def get_users_with_periodic_check() -> list[dict]:
+
+async def claim_due_users() -> list[aiosqlite.Row]:
     """
-    Get all users who have periodic checks enabled.
+    Get users whose periodic check is due and schedule their next one.
+
+    Selecting and rescheduling happen in one write transaction, so a user
+    is never handed to two overlapping ticks.
 
     Returns:
-        list[dict]: List of user records
+        list[aiosqlite.Row]: Rows with telegram_user_id, email_encrypted,
+            password_encrypted, last_status and next_check_at
     """
-    async with aiosqlite.connect(settings.database_path) as conn:
-        conn.row_factory = aiosqlite.Row
-        cursor = await conn.execute("""
-            SELECT * FROM users
-            WHERE periodic_check_enabled = 1
-            ORDER BY id
-        """)
+    now = now_iso()
+
+    async with write_transaction() as conn:
+        rows = list(await conn.execute_fetchall(_SQL_GET_DUE_USERS, (now,)))
+
+        if rows:
+            await conn.executemany(_SQL_SET_NEXT_CHECK, [
+                (
+                    _next_check_at(row['next_check_at'], now),
+                    row['telegram_user_id']
+                )
+                for row in rows
+            ])
 
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return rows
 
 
-async def delete_user(telegram_user_id: int) -> None:
+async def iter_users_with_periodic_check(
+    batch_size: int = PERIODIC_USERS_PAGE_SIZE
+) -> AsyncIterator[aiosqlite.Row]:
     """
-    Delete a user and all their data.
+    Iterate over users with periodic checks enabled, one page at a time.
+
+    Pages are fetched by keyset (id > last seen id), so memory stays bounded
+    and consumers can start work before every user has been read. The pooled
+    connection is returned before each page is yielded.
 
     Args:
-        telegram_user_id: Telegram user ID
+        batch_size: Number of rows fetched per query
+
+    Yields:
+        aiosqlite.Row: Row with id, telegram_user_id, email_encrypted,
+            password_encrypted and last_status
+    """
+    last_id = 0
+
+    while True:
+        async with get_db_connection() as conn:
+            rows = list(await conn.execute_fetchall(
+                _SQL_GET_PERIODIC_USERS_PAGE,
+                (last_id, batch_size)
+            ))
+
+        for row in rows:
+            yield row
+
+        if len(rows) < batch_size:
+            return
+
+        last_id = rows[-1]['id']
+
+
+async def delete_user_if_exists(
+    telegram_user_id: int
+) -> Optional[tuple[str, str]]:
     """
-    async with aiosqlite.connect(settings.database_path) as conn:
-        await conn.execute("""
-            DELETE FROM users WHERE telegram_user_id = ?
-        """, (telegram_user_id,))
+    Delete a user and all their data, reporting whether a row existed.
+
+    Uses DELETE ... RETURNING, so callers need no SELECT beforehand.
+
+    Args:
+        telegram_user_id: Telegram user ID
 
-        await conn.commit()
+    Returns:
+        tuple[str, str] | None: The deleted user's encrypted email and
+            encrypted password, or None if there was no such user
+    """
+    async with write_transaction() as conn:
+        rows = await conn.execute_fetchall(
+            _SQL_DELETE_USER_RETURNING,
+            (telegram_user_id,)
+        )
+        return (rows[0][0], rows[0][1]) if rows else None
@@ -15,6 +15,10 @@ from app.telegram_bot.handlers import (
 
 logger = logging.getLogger(__name__)
 
+# Long-poll window for getUpdates in seconds; Telegram holds the request open
+# until an update arrives, so a longer window means fewer idle round-trips
+POLLING_TIMEOUT = 30
+
 
 def create_bot_application() -> Application:
     """
@@ -23,14 +27,16 @@ def create_bot_application() -> Application:
     Returns:
         Application: Configured bot application
     """
-    # Create application
+    # Create application. Updates are processed one at a time, as the /start
+    # ConversationHandler requires.
     application = Application.builder().token(settings.telegram_bot_token).build()
 
     # Add conversation handler for /start flow
     application.add_handler(get_conversation_handler())
 
-    # Add command handlers
-    application.add_handler(CommandHandler("status", status))
+    # Add command handlers. /status does an AIMA login, so it runs without
+    # blocking other updates.
+    application.add_handler(CommandHandler("status", status, block=False))
     application.add_handler(CommandHandler("stop", stop))
     application.add_handler(CommandHandler("delete", delete_user_data))
     application.add_handler(CommandHandler("help", help_command))
@@ -58,7 +64,9 @@ async def start_bot(application: Application) -> None:
 
     # Start polling (include my_chat_member for blocked/unblocked events)
     await application.updater.start_polling(
-        allowed_updates=["message", "callback_query", "my_chat_member"]
+        allowed_updates=["message", "callback_query", "my_chat_member"],
+        timeout=POLLING_TIMEOUT,
+        poll_interval=0.0
     )
 
     logger.info("Telegram bot started successfully")
@@ -1,8 +1,10 @@
 """Telegram bot handlers for AIMA status checking."""
 
+import asyncio
 import logging
 import re
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from typing import Optional
+from telegram import Message, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -13,17 +15,66 @@ from telegram.ext import (
 )
 from app import aima_checker
 from app.services import user_service
-from app.crypto import get_encryption_key, encrypt_value, decrypt_value, EncryptionError
-from app.config import settings
+from app.crypto import (
+    encrypt_credentials,
+    decrypt_credentials,
+    forget_user_keys,
+    EncryptionError
+)
 from app.utils import format_timestamp
 from app.constants import get_user_agent_for_user
+from app.telegram_bot.ratelimit import rate_limiter
 
 
 logger = logging.getLogger(__name__)
 
+# Fire-and-forget tasks, referenced here so they are not garbage collected
+# before they finish
+_background_tasks: set[asyncio.Task] = set()
+
 # Conversation states
 AWAITING_EMAIL, AWAITING_PASSWORD, AWAITING_PERIODIC_CHOICE = range(3)
 
+# Basic email shape check, compiled once. Whitespace is rejected so obvious
+# typos fail here instead of costing an AIMA login.
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+\Z')
+
+# Yes/No keyboard offered after credentials are saved
+_PERIODIC_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("Yes ✅", callback_data="periodic_yes"),
+        InlineKeyboardButton("No ❌", callback_data="periodic_no")
+    ]
+])
+
+# /help message (Markdown)
+_HELP_TEXT = (
+    "🤖 *AIMA Status Checker Bot*\n\n"
+    "I help you monitor your AIMA application status automatically.\n\n"
+    "*Available Commands:*\n"
+    "/start - Set up your credentials and begin monitoring\n"
+    "/status - Check your application status right now\n"
+    "/stop - Disable automatic periodic checks\n"
+    "/delete - Permanently delete all your data\n"
+    "/help - Show this help message\n"
+    "/cancel - Cancel current operation\n\n"
+    "*How It Works:*\n"
+    "1️⃣ Use /start to securely save your AIMA credentials\n"
+    "2️⃣ Choose to enable periodic monitoring\n"
+    "3️⃣ Receive instant notifications when your status changes\n"
+    "4️⃣ Get scheduled updates at 10 AM and 7 PM (Lisbon time)\n\n"
+    "*Privacy & Security:*\n"
+    "🔒 Your credentials are encrypted with military-grade encryption\n"
+    "🗑️ Use /delete to remove all your data anytime\n"
+    "🔄 Data is auto-deleted if you block the bot\n"
+    "🔐 Your password is never stored in plain text\n\n"
+    "*Monitoring Schedule:*\n"
+    "• Checks every hour with smart distribution\n"
+    "• Immediate notification on status changes\n"
+    "• Daily updates at 10 AM & 7 PM if no changes\n\n"
+    "Need help? Just ask! 😊"
+)
+
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle /start command - begin credential setup."""
@@ -44,7 +95,7 @@ async def receive_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     email = update.message.text.strip()
 
     # Basic email validation
-    if not re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
+    if not _EMAIL_RE.match(email):
         await update.message.reply_text(
             "That doesn't look like a valid email address.\n"
             "Please try again:"
@@ -61,6 +112,14 @@ async def receive_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return AWAITING_PASSWORD
 
 
+async def _safe_delete(message: Message) -> None:
+    """Delete a message, ignoring failures (e.g. it is already gone)."""
+    try:
+        await message.delete()
+    except Exception:
+        pass
+
+
 async def receive_password(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle password input and perform first check."""
     password = update.message.text
@@ -73,26 +132,45 @@ async def receive_password(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         )
         return ConversationHandler.END
 
-    # Delete the message containing password for security
-    try:
-        await update.message.delete()
-    except Exception:
-        pass
-
-    # Send checking message
-    status_msg = await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="Checking your credentials... ⏳"
-    )
+    # Delete the message containing password for security, without making
+    # the login wait for it
+    delete_task = asyncio.create_task(_safe_delete(update.message))
+    _background_tasks.add(delete_task)
+    delete_task.add_done_callback(_background_tasks.discard)
+
+    async def send_checking_message() -> Message:
+        async with rate_limiter.acquire(update.effective_chat.id):
+            return await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="Checking your credentials... ⏳"
+            )
 
     # Derive user agent from telegram user ID
     user_agent = get_user_agent_for_user(user_id)
 
-    # Check credentials
+    # Send the checking message while the credentials are checked
+    checking_task = asyncio.create_task(send_checking_message())
     result = await aima_checker.login_and_get_status(email, password, user_agent)
 
+    # A failed "Checking..." message must not lose the login result
+    try:
+        status_msg: Optional[Message] = await checking_task
+    except Exception as e:
+        logger.warning(f"Failed to send checking message to user {user_id}: {e}")
+        status_msg = None
+
+    async def show_result(text: str) -> None:
+        if status_msg is not None:
+            await status_msg.edit_text(text)
+            return
+        async with rate_limiter.acquire(update.effective_chat.id):
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=text
+            )
+
     if result['status'] == 'error':
-        await status_msg.edit_text(
+        await show_result(
             f"❌ Error: {result['error']}\n\n"
             "Please check your credentials and try again with /start"
         )
@@ -100,64 +178,41 @@ async def receive_password(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
     # Success - encrypt and store credentials
     try:
-        encryption_key = get_encryption_key(settings.telegram_bot_token, user_id)
-        email_encrypted = encrypt_value(email, encryption_key)
-        password_encrypted = encrypt_value(password, encryption_key)
-
-        # Check if user exists
-        existing_user = await user_service.get_user_by_telegram_id(user_id)
-
-        if existing_user:
-            # Update existing user
-            await user_service.update_user_credentials(
-                user_id,
-                email_encrypted,
-                password_encrypted
-            )
-        else:
-            # Create new user
-            await user_service.create_user(
-                user_id,
-                email_encrypted,
-                password_encrypted
-            )
+        email_encrypted, password_encrypted = encrypt_credentials(
+            email, password, user_id
+        )
 
-        # Update last status
-        await user_service.update_last_status(
+        # Create or update the user together with the first status
+        await user_service.upsert_user_with_status(
             user_id,
+            email_encrypted,
+            password_encrypted,
             result['status_text'],
             result['timestamp']
         )
 
     except Exception as e:
         logger.error(f"Failed to store credentials: {e}")
-        await status_msg.edit_text(
+        await show_result(
             "❌ Error saving your credentials. Please try again later."
         )
         return ConversationHandler.END
 
     # Send status result
     timestamp_formatted = format_timestamp(result['timestamp'])
-    await status_msg.edit_text(
+    await show_result(
         f"✅ Status Retrieved Successfully!\n\n"
         f"{result['status_text']}\n\n"
         f"Last checked: {timestamp_formatted}"
     )
 
     # Ask about periodic checks
-    keyboard = [
-        [
-            InlineKeyboardButton("Yes ✅", callback_data="periodic_yes"),
-            InlineKeyboardButton("No ❌", callback_data="periodic_no")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="Would you like me to check your status periodically and notify you of any changes?",
-        reply_markup=reply_markup
-    )
+    async with rate_limiter.acquire(update.effective_chat.id):
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="Would you like me to check your status periodically and notify you of any changes?",
+            reply_markup=_PERIODIC_MARKUP
+        )
 
     return AWAITING_PERIODIC_CHOICE
 
@@ -211,10 +266,13 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /status command - check status immediately."""
     user_id = update.effective_user.id
 
-    # Get user from database
-    user = await user_service.get_user_by_telegram_id(user_id)
+    # Get credentials from database. The read and the later status write use
+    # separate short pool checkouts on purpose: holding one connection (and
+    # the write lock) across the AIMA login would stall every other writer
+    # for the length of the HTTP round-trips.
+    credentials = await user_service.get_credentials(user_id)
 
-    if not user:
+    if not credentials:
         await update.message.reply_text(
             "You haven't set up your credentials yet.\n"
             "Use /start to get started."
@@ -223,9 +281,7 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     # Decrypt credentials
     try:
-        encryption_key = get_encryption_key(settings.telegram_bot_token, user_id)
-        email = decrypt_value(user['email_encrypted'], encryption_key)
-        password = decrypt_value(user['password_encrypted'], encryption_key)
+        email, password = decrypt_credentials(*credentials, user_id)
     except EncryptionError as e:
         logger.error(f"Decryption error for user {user_id}: {e}")
         await update.message.reply_text(
@@ -268,16 +324,12 @@ async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /stop command - disable periodic checks."""
     user_id = update.effective_user.id
 
-    user = await user_service.get_user_by_telegram_id(user_id)
-
-    if not user:
+    if not await user_service.try_disable_periodic(user_id):
         await update.message.reply_text(
             "You don't have any active monitoring."
         )
         return
 
-    await user_service.set_periodic_check(user_id, False)
-
     await update.message.reply_text(
         "✅ Periodic checks disabled.\n\n"
         "Your credentials are still saved.\n"
@@ -289,53 +341,42 @@ async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /help command - show bot information and commands."""
-    help_text = (
-        "🤖 *AIMA Status Checker Bot*\n\n"
-        "I help you monitor your AIMA application status automatically.\n\n"
-        "*Available Commands:*\n"
-        "/start - Set up your credentials and begin monitoring\n"
-        "/status - Check your application status right now\n"
-        "/stop - Disable automatic periodic checks\n"
-        "/delete - Permanently delete all your data\n"
-        "/help - Show this help message\n"
-        "/cancel - Cancel current operation\n\n"
-        "*How It Works:*\n"
-        "1️⃣ Use /start to securely save your AIMA credentials\n"
-        "2️⃣ Choose to enable periodic monitoring\n"
-        "3️⃣ Receive instant notifications when your status changes\n"
-        "4️⃣ Get scheduled updates at 10 AM and 7 PM (Lisbon time)\n\n"
-        "*Privacy & Security:*\n"
-        "🔒 Your credentials are encrypted with military-grade encryption\n"
-        "🗑️ Use /delete to remove all your data anytime\n"
-        "🔄 Data is auto-deleted if you block the bot\n"
-        "🔐 Your password is never stored in plain text\n\n"
-        "*Monitoring Schedule:*\n"
-        "• Checks every hour with smart distribution\n"
-        "• Immediate notification on status changes\n"
-        "• Daily updates at 10 AM & 7 PM if no changes\n\n"
-        "Need help? Just ask! 😊"
-    )
-
     await update.message.reply_text(
-        help_text,
+        _HELP_TEXT,
         parse_mode='Markdown'
     )
 
 
+def _forget_user(user_id: int, credentials: tuple[str, str]) -> None:
+    """
+    Drop everything cached in memory for a deleted user.
+
+    Args:
+        user_id: Telegram user ID
+        credentials: The deleted user's encrypted email and password
+    """
+    try:
+        aima_checker.forget_session(*decrypt_credentials(*credentials, user_id))
+    except EncryptionError as e:
+        logger.warning(f"Could not decrypt credentials of deleted user {user_id}: {e}")
+
+    forget_user_keys(user_id)
+
+
 async def delete_user_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /delete command - completely delete user data."""
     user_id = update.effective_user.id
 
-    user = await user_service.get_user_by_telegram_id(user_id)
+    # Delete user data
+    credentials = await user_service.delete_user_if_exists(user_id)
 
-    if not user:
+    if not credentials:
         await update.message.reply_text(
             "You don't have any data stored."
         )
         return
 
-    # Delete user data
-    await user_service.delete_user(user_id)
+    _forget_user(user_id, credentials)
 
     await update.message.reply_text(
         "🗑️ Your data has been completely deleted.\n\n"
@@ -360,9 +401,9 @@ async def handle_bot_blocked(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.info(f"User {user_id} blocked/removed the bot - deleting their data")
 
         try:
-            user = await user_service.get_user_by_telegram_id(user_id)
-            if user:
-                await user_service.delete_user(user_id)
+            credentials = await user_service.delete_user_if_exists(user_id)
+            if credentials:
+                _forget_user(user_id, credentials)
                 logger.info(f"Successfully deleted data for user {user_id}")
         except Exception as e:
             logger.error(f"Error deleting data for user {user_id}: {e}")
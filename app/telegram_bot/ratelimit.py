@@ -0,0 +1,131 @@
+"""Rate limiting for outgoing Telegram messages."""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator
+from telegram.error import RetryAfter
+
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages per second overall...
+GLOBAL_RATE = 30
+GLOBAL_PER = 1.0
+
+# ...and about one message per second to the same chat
+PER_CHAT_INTERVAL = 1.0
+
+# Per-chat send times are pruned once this many chats are tracked
+PER_CHAT_PRUNE_SIZE = 10000
+
+
+class RateLimiter:
+    """Token bucket for the global limit plus a minimum gap per chat."""
+
+    def __init__(
+        self,
+        rate: int = GLOBAL_RATE,
+        per: float = GLOBAL_PER,
+        per_chat_interval: float = PER_CHAT_INTERVAL
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rate: Messages allowed per `per` seconds across all chats
+            per: Length of the global window in seconds
+            per_chat_interval: Minimum seconds between messages to one chat
+        """
+        self.rate = rate
+        self.per = per
+        self.per_chat_interval = per_chat_interval
+
+        self._tokens = float(rate)
+        self._updated_at = 0.0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self._next_chat_slot: dict[int, float] = {}
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        """Reserve the chat's next send slot and sleep until it arrives."""
+        now = asyncio.get_running_loop().time()
+
+        if len(self._next_chat_slot) > PER_CHAT_PRUNE_SIZE:
+            self._next_chat_slot = {
+                chat: slot for chat, slot in self._next_chat_slot.items()
+                if slot > now
+            }
+
+        slot = max(now, self._next_chat_slot.get(chat_id, 0.0))
+        self._next_chat_slot[chat_id] = slot + self.per_chat_interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _take_token(self) -> None:
+        """Take one token from the global bucket, waiting if it is empty."""
+        loop = asyncio.get_running_loop()
+
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = loop.time()
+
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                if self._updated_at:
+                    elapsed = now - self._updated_at
+                    self._tokens = min(
+                        float(self.rate),
+                        self._tokens + elapsed * self.rate / self.per
+                    )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while, e.g. after a 429 from Telegram.
+
+        Args:
+            seconds: How long to pause all sends
+        """
+        until = asyncio.get_running_loop().time() + seconds
+        self._paused_until = max(self._paused_until, until)
+        self._tokens = 0.0
+
+    @asynccontextmanager
+    async def acquire(self, chat_id: int) -> AsyncIterator[None]:
+        """
+        Wait until a message may be sent to a chat.
+
+        A RetryAfter raised inside the block pauses every sender for the
+        interval Telegram asked for, then propagates.
+
+        Args:
+            chat_id: Chat the message is going to
+        """
+        await self._wait_for_chat(chat_id)
+        await self._take_token()
+
+        try:
+            yield
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning(f"Telegram rate limit hit, pausing sends for {retry_after}s")
+            self.pause(retry_after)
+            raise
+
+
+# Shared limiter for every message the bot sends
+rate_limiter = RateLimiter()
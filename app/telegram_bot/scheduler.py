@@ -2,30 +2,43 @@
 
 import asyncio
 import logging
-import random
 from datetime import datetime, time
-from typing import Optional
-import pytz
+from typing import AsyncIterator, Optional
+from zoneinfo import ZoneInfo
+import aiosqlite
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from telegram import Bot
 from app import aima_checker
-from app.services import user_service
-from app.crypto import get_encryption_key, decrypt_value, EncryptionError
 from app.config import settings
+from app.services import user_service
+from app.crypto import decrypt_credentials, EncryptionError
 from app.utils import format_timestamp
 from app.constants import get_user_agent_for_user
+from app.telegram_bot.ratelimit import rate_limiter
 
 
 logger = logging.getLogger(__name__)
 
 # Lisbon timezone
-LISBON_TZ = pytz.timezone('Europe/Lisbon')
+LISBON_TZ = ZoneInfo('Europe/Lisbon')
 
 # Scheduled notification times (Lisbon time)
 MORNING_HOUR = 10  # 10 AM
 EVENING_HOUR = 19  # 7 PM
 
+# Maximum number of checks waiting for a worker; jobs wait when it is full
+CHECK_QUEUE_SIZE = 1000
+
+# How often to look for users whose periodic check is due (minutes)
+DUE_CHECK_INTERVAL_MINUTES = 5
+
+
+async def _iterate(rows: list[aiosqlite.Row]) -> AsyncIterator[aiosqlite.Row]:
+    """Yield rows from a list, for code that expects an async iterator."""
+    for row in rows:
+        yield row
+
 
 class StatusScheduler:
     """Manages periodic status checks for all users."""
@@ -41,16 +54,25 @@ class StatusScheduler:
         self.scheduler = AsyncIOScheduler(timezone=LISBON_TZ)
         self.is_running = False
 
+        # Checks from every job go through one queue served by a fixed set
+        # of workers, so AIMA load stays bounded even when jobs overlap.
+        # Items are (user, check_user_status kwargs, completion future).
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=CHECK_QUEUE_SIZE)
+        self._workers: list[asyncio.Task] = []
+
     def start(self):
         """Start the scheduler."""
         if self.is_running:
             return
 
-        # Schedule hourly checks (at minute 0 of each hour)
+        # Check users whose periodic (hourly) check is due, every few minutes
         self.scheduler.add_job(
-            self.run_hourly_checks,
-            trigger=CronTrigger(minute=0, timezone=LISBON_TZ),
-            id='hourly_checks'
+            self.run_due_checks,
+            trigger=CronTrigger(
+                minute=f'*/{DUE_CHECK_INTERVAL_MINUTES}',
+                timezone=LISBON_TZ
+            ),
+            id='due_checks'
         )
 
         # Schedule morning notifications (10 AM Lisbon time)
@@ -70,82 +92,119 @@ class StatusScheduler:
         )
 
         self.scheduler.start()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(settings.hourly_concurrency)
+        ]
         self.is_running = True
         logger.info("Status checker scheduler started")
 
-    def stop(self):
-        """Stop the scheduler."""
+    async def stop(self):
+        """Stop the scheduler and its check workers."""
         if not self.is_running:
             return
 
         self.scheduler.shutdown()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Release any job still waiting on checks that will never run. The
+        # futures are resolved rather than cancelled so the job finishes
+        # quietly instead of raising CancelledError.
+        while not self._queue.empty():
+            _, _, done = self._queue.get_nowait()
+            if not done.done():
+                done.set_result(None)
+
         self.is_running = False
         logger.info("Status checker scheduler stopped")
 
-    async def run_hourly_checks(self):
+    async def _worker(self) -> None:
+        """Run queued checks one at a time until cancelled."""
+        while True:
+            user, check_kwargs, done = await self._queue.get()
+            try:
+                await self.check_user_status(user, **check_kwargs)
+            except Exception as e:
+                logger.error(f"Error checking user {user['telegram_user_id']}: {e}")
+            finally:
+                if not done.done():
+                    done.set_result(None)
+                self._queue.task_done()
+
+    async def _run_checks(
+        self,
+        users: AsyncIterator[aiosqlite.Row],
+        **check_kwargs
+    ) -> None:
         """
-        Run hourly status checks for all users with periodic checks enabled.
-        Distributes checks evenly across the hour with jitter.
+        Queue a check for each user and wait for all of them to finish.
+
+        Args:
+            users: User rows to check
+            **check_kwargs: Extra arguments for check_user_status
         """
+        loop = asyncio.get_running_loop()
+        done = []
+
         try:
-            # Get all users with periodic checks enabled
-            users = await user_service.get_users_with_periodic_check()
+            # Workers start on the first users while later ones are still
+            # being read; a full queue makes this loop wait
+            async for user in users:
+                future = loop.create_future()
+                await self._queue.put((user, check_kwargs, future))
+                done.append(future)
+        finally:
+            await asyncio.gather(*done)
+
+    async def run_due_checks(self):
+        """
+        Run status checks for every user whose periodic check is due.
+
+        Runs every few minutes. Claiming a user schedules their next check
+        about an hour ahead (with jitter), so checks stay spread across the
+        hour and a newly enabled user never waits for a whole sweep.
+        """
+        try:
+            users = await user_service.claim_due_users()
 
             if not users:
-                logger.info("No users with periodic checks enabled")
                 return
 
-            num_users = len(users)
-            logger.info(f"Starting hourly checks for {num_users} users")
-
-            # Calculate even distribution across 60 minutes
-            # Leave some buffer time (50 minutes instead of 60)
-            interval_seconds = (50 * 60) / num_users if num_users > 0 else 60
-
-            # Shuffle users to randomize order
-            random.shuffle(users)
+            logger.info(f"Starting periodic checks for {len(users)} due users")
 
-            # Process each user sequentially with delays
-            for i, user in enumerate(users):
-                try:
-                    # Add small random jitter (±2 minutes)
-                    jitter = random.uniform(-120, 120)
-                    delay = (i * interval_seconds) + jitter
+            await self._run_checks(_iterate(users), is_scheduled_notification=False)
 
-                    # Don't delay the first user
-                    if i > 0 and delay > 0:
-                        await asyncio.sleep(delay)
-
-                    await self.check_user_status(user, is_scheduled_notification=False)
-
-                except Exception as e:
-                    logger.error(f"Error checking user {user['telegram_user_id']}: {e}")
-                    continue
-
-            logger.info("Hourly checks completed")
+            logger.info("Periodic checks completed")
 
         except Exception as e:
-            logger.error(f"Error in run_hourly_checks: {e}")
+            logger.error(f"Error in run_due_checks: {e}")
 
     async def check_user_status(
         self,
-        user: dict,
-        is_scheduled_notification: bool = False
+        user: aiosqlite.Row,
+        is_scheduled_notification: bool = False,
+        now: Optional[datetime] = None
     ):
         """
         Check status for a single user and notify if needed.
 
         Args:
-            user: User record from database
+            user: User row from the database
             is_scheduled_notification: True if this is a scheduled 10 AM/7 PM check
+            now: Current time shared by a whole run, used to format timestamps
         """
         user_id = user['telegram_user_id']
 
         try:
-            # Decrypt credentials
-            encryption_key = get_encryption_key(settings.telegram_bot_token, user_id)
-            email = decrypt_value(user['email_encrypted'], encryption_key)
-            password = decrypt_value(user['password_encrypted'], encryption_key)
+            # Decrypt credentials. Ciphers are cached per user, so this costs
+            # microseconds; plaintext is deliberately not kept between checks.
+            email, password = decrypt_credentials(
+                user['email_encrypted'], user['password_encrypted'], user_id
+            )
 
             # Derive user agent from telegram user ID
             user_agent = get_user_agent_for_user(user_id)
@@ -157,49 +216,50 @@ class StatusScheduler:
             if result['status'] == 'error':
                 # Only notify about errors during scheduled notifications
                 if is_scheduled_notification:
-                    await self.bot.send_message(
-                        chat_id=user_id,
-                        text=f"⚠️ Status Check Failed\n\n"
-                             f"Error: {result['error']}\n\n"
-                             f"Time: {result['timestamp']}"
-                    )
+                    async with rate_limiter.acquire(user_id):
+                        await self.bot.send_message(
+                            chat_id=user_id,
+                            text=f"⚠️ Status Check Failed\n\n"
+                                 f"Error: {result['error']}\n\n"
+                                 f"Time: {result['timestamp']}"
+                        )
                 logger.warning(f"Check failed for user {user_id}: {result['error']}")
                 return
 
-            # Compare with last status
-            last_status = user.get('last_status', '')
-            status_changed = last_status != result['status_text']
-
-            # Update database
-            await user_service.update_last_status(
-                user_id,
-                result['status_text'],
-                result['timestamp']
+            # Compare with last status and store a change right away. The
+            # write only applies if the stored status still differs, so when
+            # two runs check the same user only one reports the change.
+            last_status = user['last_status'] or ''
+            status_changed = (
+                last_status != result['status_text']
+                and await user_service.update_last_status(
+                    user_id,
+                    result['status_text'],
+                    result['timestamp']
+                )
             )
 
-            # Determine if we should send notification
-            should_notify = False
-            notification_reason = ""
+            # Unchanged status outside a scheduled run: nothing to send
+            if not status_changed and not is_scheduled_notification:
+                return
 
+            # Send notification
             if status_changed:
-                should_notify = True
                 notification_reason = "🔔 Status Changed!"
-            elif is_scheduled_notification:
-                should_notify = True
+            else:
                 notification_reason = "📋 Scheduled Update"
 
-            # Send notification
-            if should_notify:
-                timestamp_formatted = format_timestamp(result['timestamp'])
-                message = f"{notification_reason}\n\n{result['status_text']}\n\n"
-                message += f"Last checked: {timestamp_formatted}"
+            timestamp_formatted = format_timestamp(result['timestamp'], now=now)
+            message = f"{notification_reason}\n\n{result['status_text']}\n\n"
+            message += f"Last checked: {timestamp_formatted}"
 
+            async with rate_limiter.acquire(user_id):
                 await self.bot.send_message(
                     chat_id=user_id,
                     text=message
                 )
 
-                logger.info(f"Notified user {user_id}: {notification_reason}")
+            logger.info(f"Notified user {user_id}: {notification_reason}")
 
         except EncryptionError as e:
             logger.error(f"Encryption error for user {user_id}: {e}")
@@ -217,16 +277,14 @@ class StatusScheduler:
         logger.info(f"Sending {time_str} scheduled notifications")
 
         try:
-            users = await user_service.get_users_with_periodic_check()
-
-            for user in users:
-                try:
-                    await self.check_user_status(user, is_scheduled_notification=True)
-                    # Small delay between notifications to avoid rate limiting
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    logger.error(f"Error in scheduled notification for user {user['telegram_user_id']}: {e}")
-                    continue
+            # One clock reading for the whole run's timestamp formatting
+            now = datetime.now(LISBON_TZ)
+
+            await self._run_checks(
+                user_service.iter_users_with_periodic_check(),
+                is_scheduled_notification=True,
+                now=now
+            )
 
             logger.info(f"{time_str} scheduled notifications completed")
 
@@ -1,32 +1,100 @@
 """Utility functions for the application."""
 
-from datetime import datetime
-import pytz
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
 
 
-def format_timestamp(iso_timestamp: str, timezone_name: str = 'Europe/Lisbon') -> str:
+logger = logging.getLogger(__name__)
+
+
+def now_iso() -> str:
+    """
+    Get the current UTC time as an ISO 8601 string.
+
+    Second precision with an explicit +00:00 offset, so the value parses
+    unambiguously both here and in the browser.
+
+    Returns:
+        str: Timestamp such as '2024-05-01T10:00:00+00:00'
+    """
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def iso_after(seconds: float, start: Optional[str] = None) -> str:
+    """
+    Get the UTC time a number of seconds after now (or after `start`),
+    formatted like now_iso().
+
+    Strings in this format compare in time order, so they can be compared
+    directly in SQL.
+
+    Args:
+        seconds: Offset in seconds
+        start: ISO timestamp to count from instead of now
+
+    Returns:
+        str: Timestamp such as '2024-05-01T11:00:00+00:00'
+    """
+    if start is None:
+        base = datetime.now(timezone.utc)
+    else:
+        base = datetime.fromisoformat(start).astimezone(timezone.utc)
+    return (base + timedelta(seconds=seconds)).isoformat(timespec='seconds')
+
+
+@lru_cache(maxsize=4096)
+def _localize_timestamp(iso_timestamp: str, timezone_name: str) -> datetime:
+    """
+    Parse an ISO timestamp and convert it to a timezone, memoized.
+
+    Only the parse and conversion are cached; the relative part of
+    format_timestamp() depends on the current time and is computed fresh.
+
+    Args:
+        iso_timestamp: ISO format timestamp string
+        timezone_name: Timezone name, e.g. 'Europe/Lisbon'
+
+    Returns:
+        datetime: The timestamp in the given timezone
+
+    Raises:
+        ValueError: If the timestamp cannot be parsed
+    """
+    # fromisoformat accepts a trailing 'Z' on 3.11+
+    dt = datetime.fromisoformat(iso_timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(ZoneInfo(timezone_name))
+
+
+def format_timestamp(
+    iso_timestamp: str,
+    timezone_name: str = 'Europe/Lisbon',
+    *,
+    now: Optional[datetime] = None
+) -> str:
     """
     Format ISO timestamp to human-readable format.
 
     Args:
         iso_timestamp: ISO format timestamp string
         timezone_name: Timezone name (default: Europe/Lisbon)
+        now: Current time (timezone-aware) to measure against; pass one when
+            formatting many timestamps in a loop
 
     Returns:
         str: Human-readable timestamp
     """
     try:
-        # Parse ISO timestamp
-        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-
-        # Convert to specified timezone
-        tz = pytz.timezone(timezone_name)
-        if dt.tzinfo is None:
-            dt = pytz.utc.localize(dt)
-        dt = dt.astimezone(tz)
+        # Parse and convert to the specified timezone
+        dt = _localize_timestamp(iso_timestamp, timezone_name)
 
         # Calculate time difference
-        now = datetime.now(tz)
+        if now is None:
+            now = datetime.now(ZoneInfo(timezone_name))
         diff = now - dt
 
         # Format based on how recent it is
@@ -44,6 +112,8 @@ def format_timestamp(iso_timestamp: str, timezone_name: str = 'Europe/Lisbon') -
             # Format as full date/time
             return dt.strftime("%d %B %Y at %H:%M")
 
-    except Exception:
-        # Fallback to original timestamp if parsing fails
+    except (ValueError, TypeError, KeyError) as e:
+        # Fallback to original timestamp if parsing fails. KeyError covers
+        # ZoneInfoNotFoundError for an unknown timezone name.
+        logger.debug(f"Could not format timestamp {iso_timestamp!r}: {e}")
         return iso_timestamp
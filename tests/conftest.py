@@ -0,0 +1,12 @@
+"""Shared pytest setup."""
+
+import os
+import tempfile
+
+# Settings are read once at import, so the environment has to be in place
+# before any app module is imported
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-token")
+os.environ.setdefault(
+    "DATABASE_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="aima-test-"), "test.db")
+)
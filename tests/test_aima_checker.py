@@ -0,0 +1,113 @@
+"""Tests for AIMA login session reuse."""
+
+import httpx
+import pytest
+from app import aima_checker
+
+
+LOGIN_PAGE = (
+    '<html><body><form>'
+    '<input type="hidden" name="tok" value="TOKEN123">'
+    '<input name="email">'
+    '</form></body></html>'
+)
+AFTER_LOGIN_PAGE = (
+    '<html><head>'
+    '<script>window.location.href="/RAR/2fase/sumario.php";</script>'
+    '</head><body></body></html>'
+)
+STATUS_PAGE = (
+    '<html><body><table><tr>'
+    '<td style="background-color: salmon;"><ul><li>Estado: Em análise</li></ul></td>'
+    '</tr></table></body></html>'
+)
+
+
+class FakeAima:
+    """Mock AIMA server that issues a new session cookie on every login."""
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self.valid_sessions: set[str] = set()
+        self.logins = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+
+        if path.endswith('login.php'):
+            return httpx.Response(200, text=LOGIN_PAGE)
+
+        if path.endswith('login_check3.php'):
+            self.logins += 1
+            session_id = f"s{self.logins}"
+            self.valid_sessions.add(session_id)
+            return httpx.Response(
+                200,
+                text=AFTER_LOGIN_PAGE,
+                headers={'set-cookie': f'PHPSESSID={session_id}; Path=/'}
+            )
+
+        if path.endswith('sumario.php'):
+            cookie = request.headers.get('cookie', '')
+            if any(f'PHPSESSID={s}' in cookie for s in self.valid_sessions):
+                return httpx.Response(200, text=STATUS_PAGE)
+            return httpx.Response(302, headers={'location': '/RAR/login.php'})
+
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def aima(monkeypatch):
+    server = FakeAima()
+    monkeypatch.setattr(aima_checker, '_transport', httpx.MockTransport(server))
+    aima_checker._sessions.clear()
+    yield server
+    aima_checker._sessions.clear()
+
+
+async def test_fresh_session_skips_login(aima):
+    first = await aima_checker.login_and_get_status('user@example.com', 'pw')
+    aima.requests.clear()
+
+    second = await aima_checker.login_and_get_status('user@example.com', 'pw')
+
+    assert first['status'] == second['status'] == 'success'
+    assert second['status_text'] == first['status_text']
+    assert aima.requests == ['/RAR/2fase/sumario.php']
+    assert aima.logins == 1
+
+
+async def test_expired_session_falls_back_to_login(aima):
+    await aima_checker.login_and_get_status('user@example.com', 'pw')
+    # The server forgets the session, so the saved cookie lands on login.php
+    aima.valid_sessions.clear()
+    aima.requests.clear()
+
+    result = await aima_checker.login_and_get_status('user@example.com', 'pw')
+
+    assert result['status'] == 'success'
+    assert aima.requests[:2] == ['/RAR/2fase/sumario.php', '/RAR/login.php']
+    assert '/RAR/login_check3.php' in aima.requests
+    assert aima.logins == 2
+
+
+async def test_session_not_shared_across_passwords(aima):
+    await aima_checker.login_and_get_status('user@example.com', 'pw')
+    aima.requests.clear()
+
+    await aima_checker.login_and_get_status('user@example.com', 'other')
+
+    assert aima.requests[0] == '/RAR/login.php'
+    assert aima.logins == 2
+
+
+async def test_forget_session_forces_login(aima):
+    await aima_checker.login_and_get_status('user@example.com', 'pw')
+    aima_checker.forget_session('user@example.com', 'pw')
+    aima.requests.clear()
+
+    await aima_checker.login_and_get_status('user@example.com', 'pw')
+
+    assert aima.requests[0] == '/RAR/login.php'
+    assert aima.logins == 2
@@ -0,0 +1,82 @@
+"""Tests for credential encryption."""
+
+import base64
+import pytest
+from cryptography.fernet import Fernet
+from app.config import settings
+from app.crypto import (
+    AESGCM_PREFIX,
+    EncryptionError,
+    decrypt_credentials,
+    encrypt_credentials,
+    get_encryption_key
+)
+
+
+USER_ID = 424242
+
+
+def _tamper(encrypted: str) -> str:
+    """Flip one bit of the ciphertext inside an AES-GCM value."""
+    raw = bytearray(base64.urlsafe_b64decode(encrypted[len(AESGCM_PREFIX):]))
+    raw[-1] ^= 0x01
+    return AESGCM_PREFIX + base64.urlsafe_b64encode(bytes(raw)).decode('ascii')
+
+
+def test_aesgcm_round_trip():
+    email_encrypted, password_encrypted = encrypt_credentials(
+        "user@example.com", "s3cret", USER_ID
+    )
+
+    assert email_encrypted.startswith(AESGCM_PREFIX)
+    assert password_encrypted.startswith(AESGCM_PREFIX)
+    assert "s3cret" not in password_encrypted
+    assert decrypt_credentials(email_encrypted, password_encrypted, USER_ID) == (
+        "user@example.com",
+        "s3cret"
+    )
+
+
+def test_aesgcm_uses_fresh_nonce():
+    first, _ = encrypt_credentials("user@example.com", "s3cret", USER_ID)
+    second, _ = encrypt_credentials("user@example.com", "s3cret", USER_ID)
+
+    assert first != second
+
+
+def test_legacy_fernet_token_decrypts():
+    fernet = Fernet(get_encryption_key(settings.telegram_bot_token, USER_ID))
+    email_token = fernet.encrypt(b"user@example.com").decode('utf-8')
+    password_token = fernet.encrypt(b"s3cret").decode('utf-8')
+
+    assert decrypt_credentials(email_token, password_token, USER_ID) == (
+        "user@example.com",
+        "s3cret"
+    )
+
+
+def test_tampered_aesgcm_value_raises():
+    email_encrypted, password_encrypted = encrypt_credentials(
+        "user@example.com", "s3cret", USER_ID
+    )
+
+    with pytest.raises(EncryptionError):
+        decrypt_credentials(email_encrypted, _tamper(password_encrypted), USER_ID)
+
+
+def test_tampered_fernet_token_raises():
+    fernet = Fernet(get_encryption_key(settings.telegram_bot_token, USER_ID))
+    token = fernet.encrypt(b"s3cret").decode('utf-8')
+    tampered = token[:-4] + ("AAAA" if token[-4:] != "AAAA" else "BBBB")
+
+    with pytest.raises(EncryptionError):
+        decrypt_credentials(tampered, tampered, USER_ID)
+
+
+def test_other_users_key_raises():
+    email_encrypted, password_encrypted = encrypt_credentials(
+        "user@example.com", "s3cret", USER_ID
+    )
+
+    with pytest.raises(EncryptionError):
+        decrypt_credentials(email_encrypted, password_encrypted, USER_ID + 1)
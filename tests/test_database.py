@@ -0,0 +1,114 @@
+"""Tests for schema migration and periodic-check scheduling."""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import pytest
+from app import database
+from app.config import settings
+from app.services import user_service
+from app.utils import iso_after, now_iso
+
+
+# users table as created before next_check_at existed
+BASELINE_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        telegram_user_id INTEGER UNIQUE NOT NULL,
+        email_encrypted TEXT NOT NULL,
+        password_encrypted TEXT NOT NULL,
+        last_status TEXT,
+        last_checked_at TEXT,
+        periodic_check_enabled INTEGER DEFAULT 0,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+"""
+
+
+@pytest.fixture
+async def db_path():
+    """Start each test from an empty database file and close the pool after."""
+    path = Path(settings.database_path)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    yield path
+
+    await database.close_db()
+
+
+def _insert_users(path: Path, users: list[tuple[int, int]]) -> None:
+    """Insert (telegram_user_id, periodic_check_enabled) rows directly."""
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO users (
+                telegram_user_id, email_encrypted, password_encrypted,
+                periodic_check_enabled, created_at, updated_at
+            ) VALUES (?, 'email', 'password', ?, 'x', 'x')
+            """,
+            users
+        )
+    conn.close()
+
+
+def _next_check_times(path: Path) -> dict[int, str]:
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT telegram_user_id, next_check_at FROM users")
+        result = dict(rows.fetchall())
+    conn.close()
+    return result
+
+
+async def test_init_db_migrates_baseline_schema(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(BASELINE_SCHEMA)
+    conn.close()
+    _insert_users(db_path, [(1, 1), (2, 1), (3, 0)])
+
+    before = now_iso()
+    await database.init_db()
+    # Running it again must not fail or touch the migrated values
+    migrated = _next_check_times(db_path)
+    await database.init_db()
+
+    assert _next_check_times(db_path) == migrated
+    assert migrated[3] is None
+    for user_id in (1, 2):
+        assert before <= migrated[user_id] <= iso_after(3600)
+
+
+async def test_claim_due_users_counts_from_previous_due_time(db_path):
+    await database.init_db()
+    _insert_users(db_path, [(1, 1), (2, 1)])
+
+    now = datetime.now(timezone.utc)
+    recent = (now - timedelta(minutes=4)).isoformat(timespec='seconds')
+    long_ago = (now - timedelta(days=1, minutes=17)).isoformat(timespec='seconds')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE users SET next_check_at = ? WHERE telegram_user_id = 1", (recent,))
+        conn.execute("UPDATE users SET next_check_at = ? WHERE telegram_user_id = 2", (long_ago,))
+    conn.close()
+
+    claimed = await user_service.claim_due_users()
+
+    assert sorted(row['telegram_user_id'] for row in claimed) == [1, 2]
+    rescheduled = {
+        user_id: datetime.fromisoformat(value)
+        for user_id, value in _next_check_times(db_path).items()
+    }
+    jitter = timedelta(seconds=user_service.CHECK_JITTER_SECONDS)
+    interval = timedelta(seconds=user_service.CHECK_INTERVAL_SECONDS)
+
+    # One interval after the previous due time, not after the claim
+    previous = datetime.fromisoformat(recent)
+    assert previous + interval - jitter <= rescheduled[1] <= previous + interval + jitter
+
+    # A long-overdue user skips the missed intervals but keeps their minute
+    # in the hour, so users do not bunch up after downtime
+    assert now < rescheduled[2] <= now + interval + jitter
+    drift = (rescheduled[2] - datetime.fromisoformat(long_ago)) % interval
+    assert drift <= jitter or drift >= interval - jitter
+
+    assert await user_service.claim_due_users() == []
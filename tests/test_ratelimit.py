@@ -0,0 +1,103 @@
+"""Tests for the outgoing message rate limiter."""
+
+import asyncio
+from datetime import timedelta
+import pytest
+from telegram.error import RetryAfter
+from app.telegram_bot.ratelimit import RateLimiter
+
+
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::telegram.warnings.PTBDeprecationWarning"
+)
+
+# Slack for scheduler jitter when comparing loop times
+TOLERANCE = 0.01
+
+
+class TimedeltaRetryAfter(RetryAfter):
+    """RetryAfter as PTB reports it with PTB_TIMEDELTA enabled."""
+
+    @property
+    def retry_after(self) -> timedelta:
+        return timedelta(seconds=self._retry_after_seconds)
+
+    def __init__(self, seconds: float):
+        self._retry_after_seconds = seconds
+        super().__init__(1)
+
+
+async def _send_times(limiter: RateLimiter, chat_ids: list[int]) -> list[float]:
+    """Acquire the limiter once per chat ID, concurrently; return grant times."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def send(chat_id: int) -> float:
+        async with limiter.acquire(chat_id):
+            return loop.time() - start
+
+    return sorted(await asyncio.gather(*(send(chat_id) for chat_id in chat_ids)))
+
+
+async def test_global_cap():
+    # 5 messages per 0.1s: a burst of 5, then one every 0.02s
+    limiter = RateLimiter(rate=5, per=0.1, per_chat_interval=0.0)
+
+    times = await _send_times(limiter, list(range(10)))
+
+    assert times[4] < TOLERANCE
+    for earlier, later in zip(times[4:], times[5:]):
+        assert later - earlier >= 0.02 - TOLERANCE
+    assert times[-1] >= 0.1 - TOLERANCE
+
+
+async def test_same_chat_gap():
+    limiter = RateLimiter(rate=100, per=1.0, per_chat_interval=0.05)
+
+    times = await _send_times(limiter, [1, 1, 1, 2])
+
+    # Chat 2 is not held back by chat 1
+    assert times[0] < TOLERANCE and times[1] < TOLERANCE
+    assert times[2] >= 0.05 - TOLERANCE
+    assert times[3] >= 0.1 - TOLERANCE
+
+
+async def _pause_after(limiter: RateLimiter, error: RetryAfter) -> float:
+    """Raise error inside acquire() and return how long the pause lasts."""
+    loop = asyncio.get_running_loop()
+
+    with pytest.raises(RetryAfter):
+        async with limiter.acquire(1):
+            raise error
+
+    return limiter._paused_until - loop.time()
+
+
+async def test_retry_after_int_pauses_all_sends():
+    limiter = RateLimiter(rate=100, per=1.0, per_chat_interval=0.0)
+
+    pause = await _pause_after(limiter, RetryAfter(3))
+
+    assert 3 - TOLERANCE <= pause <= 3
+    assert limiter._tokens == 0.0
+
+
+async def test_retry_after_timedelta_pauses_all_sends():
+    limiter = RateLimiter(rate=100, per=1.0, per_chat_interval=0.0)
+
+    pause = await _pause_after(limiter, TimedeltaRetryAfter(0.1))
+    assert 0.1 - TOLERANCE <= pause <= 0.1
+
+    # Another chat has to wait out the pause too
+    times = await _send_times(limiter, [2])
+    assert times[0] >= 0.1 - TOLERANCE
+
+
+async def test_chat_slots_are_pruned():
+    limiter = RateLimiter(rate=1000, per=1.0, per_chat_interval=0.0)
+
+    await _send_times(limiter, list(range(5)))
+    limiter._next_chat_slot.update({chat_id: 0.0 for chat_id in range(10, 10011)})
+    await _send_times(limiter, [1])
+
+    assert len(limiter._next_chat_slot) < 10